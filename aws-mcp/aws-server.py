@@ -5,13 +5,40 @@ Focuses on free/low-cost AWS services for learning
 """
 
 import json
+import os
 import sys
+import threading
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_deadlines import current_context
+from mcp_transport import dumps_text, serve_stdio
+
 class AWSMCP:
+    # Default per-tool timeouts in seconds (override with MCP_TOOL_TIMEOUTS)
+    TOOL_TIMEOUTS = {
+        "list_s3_buckets": 15,
+        "get_aws_regions": 15,
+        "invoke_bedrock_model": 60
+    }
+    # Admission limits per tool and upstream (override with MCP_RATE_LIMITS)
+    RATE_LIMITS = {
+        "upstreams": {
+            "bedrock": {"rate": 1, "burst": 2, "concurrency": 2, "queue": 10, "max_wait": 30},
+            "aws-api": {"rate": 5, "burst": 5, "concurrency": 4, "queue": 20, "max_wait": 10}
+        },
+        "tool_upstreams": {
+            "invoke_bedrock_model": "bedrock",
+            "list_s3_buckets": "aws-api",
+            "get_aws_regions": "aws-api"
+        }
+    }
+
     def __init__(self):
         self.session = None
+        self.session_lock = threading.Lock()  # boto3 sessions are not thread-safe
         self.init_aws_session()
     
     def init_aws_session(self):
@@ -24,6 +51,19 @@ class AWSMCP:
         except (NoCredentialsError, ClientError):
             self.session = None
     
+    def client(self, service, **kwargs):
+        """Create a client whose timeouts fit the current request's deadline"""
+        context = current_context()
+        config = Config(
+            connect_timeout=max(0.1, context.remaining(5)),
+            read_timeout=max(0.1, context.remaining(60))
+        )
+        with self.session_lock:
+            client = self.session.client(service, config=config, **kwargs)
+        # Closing only frees idle pooled connections; an in-flight call ends at its timeouts
+        context.on_cancel(client.close)
+        return client
+    
     def handle_request(self, request):
         method = request.get('method')
         params = request.get('params', {})
@@ -86,19 +126,19 @@ class AWSMCP:
     
     def list_s3_buckets(self):
         try:
-            s3 = self.session.client('s3')
+            s3 = self.client('s3')
             response = s3.list_buckets()
             buckets = [bucket['Name'] for bucket in response['Buckets']]
-            return {"content": [{"type": "text", "text": f"S3 Buckets: {json.dumps(buckets, indent=2)}"}]}
+            return {"content": [{"type": "text", "text": f"S3 Buckets: {dumps_text(buckets)}"}]}
         except Exception as e:
             return {"error": f"S3 error: {str(e)}"}
     
     def get_aws_regions(self):
         try:
-            ec2 = self.session.client('ec2', region_name='us-east-1')
+            ec2 = self.client('ec2', region_name='us-east-1')
             response = ec2.describe_regions()
             regions = [region['RegionName'] for region in response['Regions']]
-            return {"content": [{"type": "text", "text": f"AWS Regions: {json.dumps(regions, indent=2)}"}]}
+            return {"content": [{"type": "text", "text": f"AWS Regions: {dumps_text(regions)}"}]}
         except Exception as e:
             return {"error": f"Regions error: {str(e)}"}
     
@@ -112,11 +152,11 @@ class AWSMCP:
             "bedrock_tokens": "Varies by model",
             "note": "This is simulated data. Use AWS Billing Dashboard for real usage."
         }
-        return {"content": [{"type": "text", "text": json.dumps(usage_info, indent=2)}]}
+        return {"content": [{"type": "text", "text": dumps_text(usage_info)}]}
     
     def invoke_bedrock_model(self, model_id, prompt, max_tokens):
         try:
-            bedrock = self.session.client('bedrock-runtime', region_name='us-west-2')
+            bedrock = self.client('bedrock-runtime', region_name='us-west-2')
             
             # Different request formats for different models
             if 'nova' in model_id:
@@ -162,12 +202,4 @@ class AWSMCP:
 if __name__ == "__main__":
     server = AWSMCP()
     
-    for line in sys.stdin:
-        try:
-            request = json.loads(line.strip())
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except Exception as e:
-            print(json.dumps({"error": str(e)}))
-            sys.stdout.flush()
\ No newline at end of file
+    serve_stdio(server.handle_request, server.TOOL_TIMEOUTS, server.RATE_LIMITS)
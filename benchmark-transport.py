@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Stdio Transport Benchmark
+Compares the old print/flush loop with mcp_transport for small and large messages
+"""
+
+import io
+import json
+import os
+import sys
+import time
+
+from mcp_transport import CONTENT_LENGTH, StdioTransport, dumps, orjson
+
+SMALL_COUNT = 20000
+LARGE_COUNT = 200
+LARGE_ROWS = 2000
+
+
+def small_request():
+    return {"method": "tools/call", "params": {"name": "get_data", "arguments": {"key": "learning"}}}
+
+
+def large_request():
+    rows = [{"id": i, "name": f"User {i}", "email": f"user{i}@example.com", "status": "active"}
+            for i in range(LARGE_ROWS)]
+    return {"method": "tools/call", "params": {"name": "store_data", "arguments": {"key": "rows", "value": rows}}}
+
+
+def echo_handler(request):
+    """Stands in for a server: wraps the arguments in a text content result"""
+    return {"content": [{"type": "text", "text": json.dumps(request["params"]["arguments"], indent=2)}]}
+
+
+def compact_echo_handler(request):
+    return {"content": [{"type": "text", "text": dumps(request["params"]["arguments"]).decode("utf-8")}]}
+
+
+def legacy_loop(data, out):
+    """The per-line loop the servers used before mcp_transport"""
+    stdin = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    for line in stdin:
+        try:
+            request = json.loads(line.strip())
+            response = echo_handler(request)
+            print(json.dumps(response), file=out)
+            out.flush()
+        except Exception as e:
+            print(json.dumps({"error": str(e)}), file=out)
+            out.flush()
+
+
+def transport_loop(data, out):
+    StdioTransport(stdin=io.BytesIO(data), stdout=out).serve(compact_echo_handler)
+
+
+def timeout_loop(data, out):
+    """The servers give every tool a default timeout, so each call carries a deadline"""
+    StdioTransport(stdin=io.BytesIO(data), stdout=out).serve(compact_echo_handler, {"default": 30})
+
+
+def frame_newline(request, count):
+    return (json.dumps(request) + "\n").encode("utf-8") * count
+
+
+def frame_newline_with_ids(request, count):
+    """Every real MCP request carries an id, which sends it through the worker pool"""
+    return b"".join((json.dumps({**request, "id": i}) + "\n").encode("utf-8") for i in range(count))
+
+
+def frame_content_length(request, count):
+    payload = json.dumps(request).encode("utf-8")
+    return (b"Content-Length: %d\r\n\r\n" % len(payload) + payload) * count
+
+
+def run(label, loop, data, count, out):
+    start = time.perf_counter()
+    loop(data, out)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {count / elapsed:>10.0f} msg/s  {len(data) / elapsed / 1e6:>8.1f} MB/s in")
+
+
+def main():
+    print("Stdio Transport Benchmark")
+    print("=========================")
+    print(f"JSON backend: {'orjson' if orjson is not None else 'stdlib json'}")
+
+    with open(os.devnull, "w") as text_out, open(os.devnull, "wb") as binary_out:
+        for name, request, count in [("small", small_request(), SMALL_COUNT),
+                                     ("large", large_request(), LARGE_COUNT)]:
+            print(f"\n{name} messages x {count}")
+            data = frame_newline(request, count)
+            run("legacy print/flush", legacy_loop, data, count, text_out)
+            run("transport (newline)", transport_loop, data, count, binary_out)
+            with_ids = frame_newline_with_ids(request, count)
+            run("transport (newline, ids)", transport_loop, with_ids, count, binary_out)
+            run("transport (ids, timeouts)", timeout_loop, with_ids, count, binary_out)
+            framed = frame_content_length(request, count)
+            run("transport (Content-Length)",
+                lambda d, o: StdioTransport(stdin=io.BytesIO(d), stdout=o,
+                                            framing=CONTENT_LENGTH).serve(compact_echo_handler),
+                framed, count, binary_out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
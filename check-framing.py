@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Stdio Framing Checker
+Feeds mcp_transport byte streams split at arbitrary points and checks the decoded messages
+"""
+
+import io
+import random
+import sys
+
+from mcp_transport import CONTENT_LENGTH, NEWLINE, StdioTransport, loads
+
+ERROR = "error"
+
+
+def framed(body, header=None):
+    """A Content-Length frame; ``header`` replaces the usual header block"""
+    body = body.encode("utf-8") if isinstance(body, str) else body
+    if header is None:
+        header = b"Content-Length: %d\r\n\r\n" % len(body)
+    return header + body
+
+
+UTF8_BODY = '{"text":"café ✓ \U0001f600"}'
+
+# name -> (input stream, expected messages). Each message is (framing, decoded JSON),
+# or (ERROR, None) where read_message() raises for a malformed message
+CASES = {
+    "newline-delimited messages": (
+        b'{"a":1}\n{"b":2}\n',
+        [(NEWLINE, {"a": 1}), (NEWLINE, {"b": 2})]),
+    "CRLF line endings": (
+        b'{"a":1}\r\n{"b":2}\r\n',
+        [(NEWLINE, {"a": 1}), (NEWLINE, {"b": 2})]),
+    "blank lines and indentation between messages": (
+        b'\n\r\n  {"a":1}\n\n\t\n{"b":2}\n\n',
+        [(NEWLINE, {"a": 1}), (NEWLINE, {"b": 2})]),
+    "trailing message without a newline": (
+        b'{"a":1}\n{"b":2}',
+        [(NEWLINE, {"a": 1}), (NEWLINE, {"b": 2})]),
+    "Content-Length frames back to back": (
+        framed('{"a":1}') + framed('{"b":2}'),
+        [(CONTENT_LENGTH, {"a": 1}), (CONTENT_LENGTH, {"b": 2})]),
+    "bare \\n\\n header separator": (
+        framed('{"a":1}', b"Content-Length: 7\n\n") + framed('{"b":2}'),
+        [(CONTENT_LENGTH, {"a": 1}), (CONTENT_LENGTH, {"b": 2})]),
+    "extra headers and lower-case names": (
+        framed('{"a":1}', b"Content-Type: application/json\r\ncontent-length: 7\r\n\r\n"),
+        [(CONTENT_LENGTH, {"a": 1})]),
+    "body with line breaks inside a frame": (
+        framed('{\n  "a": 1\n}\n') + b'{"b":2}\n',
+        [(CONTENT_LENGTH, {"a": 1}), (NEWLINE, {"b": 2})]),
+    "UTF-8 body, Content-Length counts bytes": (
+        framed(UTF8_BODY) + UTF8_BODY.encode("utf-8") + b"\n",
+        [(CONTENT_LENGTH, loads(UTF8_BODY)), (NEWLINE, loads(UTF8_BODY))]),
+    "mixed framings": (
+        b'{"a":1}\n' + framed('{"b":2}') + b'{"c":3}\n' + framed('{"d":4}'),
+        [(NEWLINE, {"a": 1}), (CONTENT_LENGTH, {"b": 2}), (NEWLINE, {"c": 3}),
+         (CONTENT_LENGTH, {"d": 4})]),
+    "body shorter than Content-Length at EOF is dropped": (
+        b'{"a":1}\n' + framed('{"b":2}', b"Content-Length: 50\r\n\r\n"),
+        [(NEWLINE, {"a": 1})]),
+    "headers cut off at EOF are dropped": (
+        b'{"a":1}\nContent-Length: 7\r\n',
+        [(NEWLINE, {"a": 1})]),
+    "missing Content-Length: error, body dropped": (
+        framed('{"dropped":true}\n', b"Content-Type: application/json\r\n\r\n") + b'{"b":2}\n',
+        [(ERROR, None), (NEWLINE, {"b": 2})]),
+    "invalid Content-Length: error, body dropped": (
+        framed('{"dropped":true}\n', b"Content-Length: seven\r\n\r\n") + framed('{"b":2}'),
+        [(ERROR, None), (CONTENT_LENGTH, {"b": 2})]),
+    "long header cut before its colon, then dropped": (
+        framed('{"dropped":true}\n', b"X-Request-Trace-Identifier: 1\r\n\r\n") + b'{"b":2}\n{"c":3}\n',
+        [(ERROR, None), (NEWLINE, {"b": 2}), (NEWLINE, {"c": 3})]),
+    "missing Content-Length at EOF": (
+        b'{"a":1}\n' + framed('{"dropped":true}', b"X-Trace: 1\r\n\r\n"),
+        [(NEWLINE, {"a": 1}), (ERROR, None)]),
+}
+
+
+class ChunkedInput:
+    """Stands in for stdin, handing out the stream in the given pieces"""
+
+    def __init__(self, pieces):
+        self.pieces = [piece for piece in pieces if piece]
+
+    def read1(self, size):
+        if not self.pieces:
+            return b""
+        piece = self.pieces.pop(0)
+        if len(piece) > size:
+            piece, rest = piece[:size], piece[size:]
+            self.pieces.insert(0, rest)
+        return piece
+
+    read = read1
+
+
+def decode(pieces):
+    transport = StdioTransport(stdin=ChunkedInput(pieces), stdout=io.BytesIO(), framing=NEWLINE)
+    messages = []
+    while True:
+        try:
+            payload = transport.read_message()
+        except ValueError:
+            messages.append((ERROR, None))
+            continue
+        if payload is None:
+            return messages
+        messages.append((transport._last_framing, loads(payload)))
+
+
+def splits(data, rng):
+    """The ways each stream is cut into reads"""
+    yield "one read", [data]
+    for cut in range(1, len(data)):
+        yield f"cut at byte {cut}", [data[:cut], data[cut:]]
+    for size in (1, 2, 3, 5, 8):
+        yield f"{size}-byte reads", [data[i:i + size] for i in range(0, len(data), size)]
+    for attempt in range(50):
+        cuts = sorted(rng.sample(range(1, len(data)), min(len(data) - 1, rng.randint(2, 6))))
+        bounds = [0] + cuts + [len(data)]
+        yield f"random cuts {cuts}", [data[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+failures = []
+
+
+def check(label, data, expected, rng):
+    tried = 0
+    for description, pieces in splits(data, rng):
+        tried += 1
+        try:
+            messages = decode(pieces)
+        except Exception as e:
+            messages = f"{type(e).__name__}: {e}"
+        if messages != expected:
+            print(f"  FAIL  {label} ({description})")
+            print(f"        expected {expected}")
+            print(f"        decoded  {messages}")
+            failures.append(label)
+            return
+    print(f"  PASS  {label} ({tried} splits)")
+
+
+def main():
+    print("Stdio Framing Checker")
+    print("=====================")
+    rng = random.Random(42)
+    for label, (data, expected) in CASES.items():
+        check(label, data, expected, rng)
+
+    print()
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        return 1
+    print("All checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,24 @@ Custom MCP Server Template
 Use this as a starting point for building your own MCP servers
 """
 
-import json
+import os
 import sys
 import requests
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_deadlines import current_context
+from mcp_transport import dumps_text, serve_stdio
+
 class CustomMCP:
+    # Default per-tool timeouts in seconds (override with MCP_TOOL_TIMEOUTS)
+    TOOL_TIMEOUTS = {"get_weather": 10}
+    # Keep wttr.in from throttling us (override with MCP_RATE_LIMITS)
+    RATE_LIMITS = {
+        "upstreams": {"wttr.in": {"rate": 1, "burst": 3, "concurrency": 2, "queue": 5, "max_wait": 5}},
+        "tool_upstreams": {"get_weather": "wttr.in"}
+    }
+
     def __init__(self):
         self.data_store = {}  # Simple in-memory storage
     
@@ -87,16 +99,20 @@ class CustomMCP:
     def get_data(self, key):
         if key in self.data_store:
             data = self.data_store[key]
-            return {"content": [{"type": "text", "text": json.dumps(data, indent=2)}]}
+            return {"content": [{"type": "text", "text": dumps_text(data)}]}
         else:
             return {"error": f"Key '{key}' not found"}
     
     def get_weather(self, city):
         """Demo API call - uses free weather service"""
+        context = current_context()
+        session = requests.Session()
+        # Closing only frees idle pooled connections; a blocked read ends at the timeout below
+        context.on_cancel(session.close)
         try:
             # Using a free weather API (no key required)
             url = f"https://wttr.in/{city}?format=j1"
-            response = requests.get(url, timeout=5)
+            response = session.get(url, timeout=max(0.1, context.remaining(5)))
             
             if response.status_code == 200:
                 data = response.json()
@@ -107,12 +123,14 @@ class CustomMCP:
                     "description": current['weatherDesc'][0]['value'],
                     "humidity": f"{current['humidity']}%"
                 }
-                return {"content": [{"type": "text", "text": json.dumps(weather_info, indent=2)}]}
+                return {"content": [{"type": "text", "text": dumps_text(weather_info)}]}
             else:
                 return {"error": f"Weather API error: {response.status_code}"}
         
         except Exception as e:
             return {"error": f"Weather request failed: {str(e)}"}
+        finally:
+            session.close()
     
     def generate_timestamp(self):
         timestamp = {
@@ -120,17 +138,9 @@ class CustomMCP:
             "unix": int(datetime.now().timestamp()),
             "readable": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
-        return {"content": [{"type": "text", "text": json.dumps(timestamp, indent=2)}]}
+        return {"content": [{"type": "text", "text": dumps_text(timestamp)}]}
 
 if __name__ == "__main__":
     server = CustomMCP()
     
-    for line in sys.stdin:
-        try:
-            request = json.loads(line.strip())
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except Exception as e:
-            print(json.dumps({"error": str(e)}))
-            sys.stdout.flush()
\ No newline at end of file
+    serve_stdio(server.handle_request, server.TOOL_TIMEOUTS, server.RATE_LIMITS)
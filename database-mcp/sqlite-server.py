@@ -4,12 +4,22 @@ SQLite MCP Server
 Provides database operations for learning SQL and data management
 """
 
-import json
 import sys
 import sqlite3
 import os
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_deadlines import current_context
+from mcp_transport import dumps_text, serve_stdio
+
 class SQLiteMCP:
+    # Default per-tool timeouts in seconds (override with MCP_TOOL_TIMEOUTS)
+    TOOL_TIMEOUTS = {"execute_query": 30, "get_schema": 10}
+    # One query at a time avoids "database is locked" errors on writes (override with MCP_RATE_LIMITS)
+    RATE_LIMITS = {
+        "tools": {"execute_query": {"concurrency": 1, "queue": 20, "max_wait": 10}}
+    }
+
     def __init__(self, db_path="learning.db"):
         self.db_path = db_path
         self.init_sample_data()
@@ -98,9 +108,17 @@ class SQLiteMCP:
         
         return {"error": "Unknown method"}
     
+    def connect(self):
+        """Open a connection that stops working when the current request is cancelled"""
+        context = current_context()
+        conn = sqlite3.connect(self.db_path, timeout=context.remaining(5.0))
+        conn.set_progress_handler(context.should_abort, 1000)  # Checked every 1000 VM steps
+        context.on_cancel(conn.interrupt)
+        return conn
+    
     def execute_query(self, query, params):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.connect()
             conn.row_factory = sqlite3.Row  # Enable column access by name
             cursor = conn.cursor()
             
@@ -108,7 +126,7 @@ class SQLiteMCP:
             
             if query.strip().upper().startswith('SELECT'):
                 results = [dict(row) for row in cursor.fetchall()]
-                return {"content": [{"type": "text", "text": json.dumps(results, indent=2)}]}
+                return {"content": [{"type": "text", "text": dumps_text(results)}]}
             else:
                 conn.commit()
                 return {"content": [{"type": "text", "text": f"Query executed successfully. Rows affected: {cursor.rowcount}"}]}
@@ -120,7 +138,7 @@ class SQLiteMCP:
     
     def get_schema(self):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -136,7 +154,7 @@ class SQLiteMCP:
                     for col in columns
                 ]
             
-            return {"content": [{"type": "text", "text": json.dumps(schema_info, indent=2)}]}
+            return {"content": [{"type": "text", "text": dumps_text(schema_info)}]}
         
         except Exception as e:
             return {"error": str(e)}
@@ -146,12 +164,4 @@ class SQLiteMCP:
 if __name__ == "__main__":
     server = SQLiteMCP("database-mcp/learning.db")
     
-    for line in sys.stdin:
-        try:
-            request = json.loads(line.strip())
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except Exception as e:
-            print(json.dumps({"error": str(e)}))
-            sys.stdout.flush()
\ No newline at end of file
+    serve_stdio(server.handle_request, server.TOOL_TIMEOUTS, server.RATE_LIMITS)
@@ -4,11 +4,13 @@ Simple File System MCP Server
 Provides read/write access to local files with safety constraints
 """
 
-import json
 import sys
 import os
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mcp_transport import serve_stdio
+
 class FileSystemMCP:
     def __init__(self, allowed_paths=None):
         self.allowed_paths = allowed_paths or [str(Path.home())]
@@ -108,12 +110,4 @@ if __name__ == "__main__":
     project_dir = os.path.dirname(os.path.abspath(__file__))
     server = FileSystemMCP([os.path.dirname(project_dir)])  # Restrict to project directory
     
-    for line in sys.stdin:
-        try:
-            request = json.loads(line.strip())
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except Exception as e:
-            print(json.dumps({"error": str(e)}))
-            sys.stdout.flush()
\ No newline at end of file
+    serve_stdio(server.handle_request)
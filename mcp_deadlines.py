@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Request deadlines and cancellation for the MCP servers
+Tools look up the running request with current_context() to bound and abort their work
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestContext:
+    """Deadline and cancellation state for one request.
+
+    ``timeout`` is in seconds; None means the request never expires.
+    Callbacks registered with on_cancel() run once when the request is
+    cancelled by the client or its deadline passes, and are how tools
+    interrupt blocking work such as SQLite queries.
+    """
+
+    def __init__(self, request_id=None, timeout=None, clock=time.monotonic):
+        self.request_id = request_id
+        self.timeout = timeout
+        self.clock = clock
+        self.deadline = clock() + timeout if timeout is not None else None
+        self.reason = None
+        self.framing = None  # set by the transport so the reply matches the request
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._cancelled = False
+        self._finished = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def remaining(self, default=None):
+        """Seconds left before the deadline, capped at ``default`` if given"""
+        if self.deadline is None:
+            return default
+        left = max(0.0, self.deadline - self.clock())
+        return left if default is None else min(left, default)
+
+    def expired(self):
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def should_abort(self):
+        """True once the request was cancelled or ran out of time"""
+        return self._cancelled or self.expired()
+
+    def on_cancel(self, callback):
+        """Run ``callback`` on cancellation (immediately if already cancelled)"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        _call_quietly(callback)
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            _call_quietly(callback)
+
+    def claim(self):
+        """Return True for the first caller only - whoever answers the request"""
+        with self._lock:
+            if self._finished:
+                return False
+            self._finished = True
+        return True
+
+
+def _call_quietly(callback):
+    try:
+        callback()
+    except Exception:
+        pass  # e.g. interrupting a connection that has already been closed
+
+
+def current_context():
+    """The context of the request running on this thread.
+
+    Outside a request a fresh, never-expiring context is returned, so
+    callbacks registered on it are dropped along with it.
+    """
+    context = getattr(_local, "context", None)
+    return context if context is not None else RequestContext()
+
+
+@contextmanager
+def request_context(context):
+    previous = getattr(_local, "context", None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+def load_tool_timeouts(defaults=None, path=None):
+    """Merge a server's per-tool timeouts with the JSON file in MCP_TOOL_TIMEOUTS.
+
+    The file maps tool names to seconds; a "default" entry applies to tools
+    without their own value, and null disables the timeout for a tool.
+    """
+    timeouts = dict(defaults or {})
+    path = path or os.environ.get("MCP_TOOL_TIMEOUTS")
+    if path:
+        with open(path) as f:
+            timeouts.update(json.load(f))
+    return timeouts
+
+
+def request_timeout(request, tool_timeouts):
+    """Effective timeout for a request: the tighter of the client's and the tool's"""
+    params = request.get("params") or {}
+    timeouts = []
+
+    meta = params.get("_meta") or {}
+    if meta.get("timeout") is not None:
+        timeouts.append(float(meta["timeout"]))
+
+    if request.get("method") == "tools/call":
+        tool_timeout = tool_timeouts.get(params.get("name"), tool_timeouts.get("default"))
+        if tool_timeout is not None:
+            timeouts.append(float(tool_timeout))
+
+    return min(timeouts) if timeouts else None
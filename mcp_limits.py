@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Admission control for the MCP servers
+Token-bucket rate limits and concurrency caps per tool and per upstream service
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being admitted"""
+
+
+class Limit:
+    """Token bucket plus concurrency cap for one tool or upstream.
+
+    ``rate`` is requests per second with bursts of up to ``burst``, which
+    must be at least 1 and is only valid with a rate; ``concurrency`` caps
+    calls in flight. When neither allows another call, up to ``queue``
+    requests wait at most ``max_wait`` seconds - anything beyond that is
+    shed.
+    """
+
+    def __init__(self, name, rate=None, burst=None, concurrency=None, queue=0,
+                 max_wait=None, clock=time.monotonic):
+        if rate is not None and rate <= 0:
+            raise ValueError(f"{name}: rate must be positive")
+        if burst is not None and rate is None:
+            raise ValueError(f"{name}: burst needs a rate")
+        if burst is not None and burst < 1:
+            raise ValueError(f"{name}: burst must be at least 1, or no call could ever go")
+        self.name = name
+        self.rate = float(rate) if rate is not None else None
+        self.burst = float(burst if burst is not None else max(1.0, self.rate)) if rate else None
+        self.concurrency = concurrency
+        self.queue = queue
+        self.max_wait = max_wait
+        self.clock = clock
+        self.tokens = self.burst
+        self._updated = clock()
+        self.in_flight = 0
+        self.waiters = []  # heap of queued Tickets
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _refill(self):
+        if self.rate is None:
+            return
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self):
+        """Seconds until one more call fits, or None while the concurrency cap is reached"""
+        if self.concurrency is not None and self.in_flight >= self.concurrency:
+            return None
+        self._refill()
+        if self.rate is None or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def snapshot(self):
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 3) if self.tokens is not None else None,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": len(self.waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled
+        }
+
+
+class Permit:
+    """Held while an admitted call runs; release() frees its concurrency slots"""
+
+    def __init__(self, controller, limits):
+        self._controller = controller
+        self._limits = limits
+
+    def release(self):
+        limits, self._limits = self._limits, []
+        if limits:
+            self._controller._release(limits)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class Ticket:
+    """A request waiting in the admission queue"""
+
+    def __init__(self, tool, limits, priority, sequence, give_up, context, on_admit, on_reject):
+        self.tool = tool
+        self.limits = limits
+        self.key = (-priority, sequence)
+        self.give_up = give_up
+        self.context = context
+        self.on_admit = on_admit
+        self.on_reject = on_reject
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class AdmissionController:
+    """Admits tool calls against the limits of the tool and of its upstream.
+
+    ``config`` has three sections: "tools" and "upstreams" map names to
+    Limit settings, and "tool_upstreams" maps tool names to the upstream
+    they call. Waiting requests are admitted highest ``priority`` first,
+    then in arrival order.
+
+    The controller never blocks or sleeps: submit() admits or queues a
+    call, and poll() is the scheduling step that admits, times out or drops
+    queued calls. ``on_change`` is called whenever poll() may have work to
+    do; the transport wakes its scheduler thread with it, while simulations
+    pass a fake ``clock`` and call poll() themselves.
+    """
+
+    def __init__(self, config=None, clock=time.monotonic, on_change=None):
+        config = config or {}
+        self.clock = clock
+        self.on_change = on_change
+        self.tool_upstreams = dict(config.get("tool_upstreams") or {})
+        self.limits = {}
+        for section, prefix in (("tools", "tool"), ("upstreams", "upstream")):
+            for name, settings in (config.get(section) or {}).items():
+                key = f"{prefix}:{name}"
+                self.limits[key] = Limit(key, clock=clock, **settings)
+        self._lock = threading.Lock()
+        self._queue = []  # Tickets waiting for admission
+        self._sequence = itertools.count()
+
+    def limits_for(self, tool):
+        keys = [f"tool:{tool}"]
+        upstream = self.tool_upstreams.get(tool)
+        if upstream:
+            keys.append(f"upstream:{upstream}")
+        return [self.limits[key] for key in keys if key in self.limits]
+
+    def admit_now(self, tool):
+        """Admit a call if it can go right now, otherwise return None"""
+        limits = self.limits_for(tool)
+        with self._lock:
+            if self._delay(None, limits) == 0:
+                return self._admit(limits)
+        return None
+
+    def try_acquire(self, tool):
+        """Admit a call right now or raise AdmissionRejected"""
+        permit = self.admit_now(tool)
+        if permit is None:
+            limits = self.limits_for(tool)
+            with self._lock:
+                self._count(limits, "rejected")
+            raise AdmissionRejected(f"{tool}: rate limit exceeded, request shed")
+        return permit
+
+    def submit(self, tool, on_admit, on_reject, priority=0, context=None):
+        """Admit a call for ``tool`` now or queue it.
+
+        ``on_admit(permit)`` runs once the call may go - immediately when
+        there is room, otherwise from poll(). A queued call that times out
+        (max_wait or the request's deadline) or is cancelled is passed to
+        ``on_reject(error)`` instead. Raises AdmissionRejected right away
+        when the queue is full. Returns the Ticket if the call was queued.
+        """
+        limits = self.limits_for(tool)
+        ticket = None
+        with self._lock:
+            if self._delay(None, limits) == 0:
+                permit = self._admit(limits)
+            else:
+                wait = self._max_wait(limits, context)
+                if (wait is not None and wait <= 0) or any(len(l.waiters) >= l.queue for l in limits):
+                    self._count(limits, "rejected")
+                    raise AdmissionRejected(f"{tool}: rate limit exceeded, request shed")
+                give_up = self.clock() + wait if wait is not None else None
+                ticket = Ticket(tool, limits, priority, next(self._sequence), give_up, context,
+                                on_admit, on_reject)
+                for limit in limits:
+                    heapq.heappush(limit.waiters, ticket)
+                    limit.queued += 1
+                self._queue.append(ticket)
+
+        if ticket is None:
+            on_admit(permit)
+            return None
+        if context is not None:
+            context.on_cancel(self._changed)
+        self._changed()
+        return ticket
+
+    def poll(self):
+        """Admit, time out or drop queued calls and run their callbacks.
+
+        Returns the seconds until the queue can next change by the passage
+        of time alone (a token refill or a wait running out), or None when
+        only a released permit or a cancellation can move it.
+        """
+        callbacks = []
+        next_due = None
+        with self._lock:
+            now = self.clock()
+            for ticket in sorted(self._queue):
+                context = ticket.context
+                if context is not None and context.cancelled:
+                    self._dequeue(ticket, "cancelled")
+                    callbacks.append((ticket.on_reject,
+                                      AdmissionRejected(f"{ticket.tool}: request {context.reason} while queued")))
+                    continue
+                delay = self._delay(ticket, ticket.limits)
+                if delay == 0:
+                    self._dequeue(ticket)
+                    callbacks.append((ticket.on_admit, self._admit(ticket.limits)))
+                    continue
+                if ticket.give_up is not None:
+                    left = ticket.give_up - now
+                    if left <= 0 or (context is not None and context.expired()):
+                        self._dequeue(ticket, "timed_out")
+                        callbacks.append((ticket.on_reject,
+                                          AdmissionRejected(f"{ticket.tool}: timed out waiting for rate limit")))
+                        continue
+                    delay = left if delay is None else min(delay, left)
+                if delay is not None:
+                    next_due = delay if next_due is None else min(next_due, delay)
+
+        for callback, argument in callbacks:
+            callback(argument)
+        return next_due
+
+    def snapshot(self):
+        """Current state and counters of every limit"""
+        with self._lock:
+            return {key: limit.snapshot() for key, limit in self.limits.items()}
+
+    def _delay(self, ticket, limits):
+        """0 when ``ticket`` (or a new call) may go now, seconds to wait for tokens, or None"""
+        delay = 0.0
+        for limit in limits:
+            if limit.waiters and limit.waiters[0] is not ticket:
+                return None  # A higher-priority or earlier request goes first
+            limit_delay = limit.delay()
+            if limit_delay is None:
+                return None
+            delay = max(delay, limit_delay)
+        return delay
+
+    def _max_wait(self, limits, context):
+        waits = [limit.max_wait for limit in limits if limit.max_wait is not None]
+        if context is not None and context.deadline is not None:
+            waits.append(context.remaining())
+        return min(waits) if waits else None
+
+    def _admit(self, limits):
+        for limit in limits:
+            if limit.rate is not None:
+                limit.tokens -= 1
+            limit.in_flight += 1
+            limit.admitted += 1
+        return Permit(self, limits)
+
+    def _dequeue(self, ticket, counter=None):
+        self._queue.remove(ticket)
+        for limit in ticket.limits:
+            limit.waiters.remove(ticket)
+            heapq.heapify(limit.waiters)
+        if counter:
+            self._count(ticket.limits, counter)
+
+    def _release(self, limits):
+        with self._lock:
+            for limit in limits:
+                limit.in_flight -= 1
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    @staticmethod
+    def _count(limits, counter):
+        for limit in limits:
+            setattr(limit, counter, getattr(limit, counter) + 1)
+
+
+def load_rate_limits(defaults=None, path=None):
+    """Merge a server's rate limits with the JSON file in MCP_RATE_LIMITS.
+
+    Entries in the file replace the server's settings for the same tool or
+    upstream; the file uses the same "tools", "upstreams" and
+    "tool_upstreams" sections as AdmissionController.
+    """
+    config = {section: dict(values) for section, values in (defaults or {}).items()}
+    path = path or os.environ.get("MCP_RATE_LIMITS")
+    if path:
+        with open(path) as f:
+            for section, values in json.load(f).items():
+                config.setdefault(section, {}).update(values)
+    return config
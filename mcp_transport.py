@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Shared stdio transport for the MCP servers
+Compact JSON encoding, buffered binary output and optional Content-Length framing
+"""
+
+import heapq
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from mcp_deadlines import RequestContext, load_tool_timeouts, request_context, request_timeout
+from mcp_limits import AdmissionController, load_rate_limits
+
+try:
+    import orjson  # Optional: pip install orjson for faster encoding/decoding
+except ImportError:
+    orjson = None
+
+NEWLINE = "newline"
+CONTENT_LENGTH = "content-length"
+
+_HEADER_RE = re.compile(rb"[A-Za-z][A-Za-z0-9-]*:")
+_READ_SIZE = 64 * 1024
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(obj):
+    """Encode an object as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits - let the stdlib try
+    return _encoder.encode(obj).encode("utf-8")
+
+
+def dumps_text(obj):
+    """Encode an object as a compact JSON string for a text content field"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass
+    return _encoder.encode(obj)
+
+
+def loads(data):
+    """Decode JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class StdioTransport:
+    """Reads requests from stdin and writes responses to stdout.
+
+    Both newline-delimited JSON and Content-Length framed messages are
+    accepted; the framing of each message is detected from its first line.
+    Each response uses the framing of the request it answers unless one is
+    forced via the ``framing`` argument or the MCP_FRAMING environment
+    variable.
+
+    Output goes through the buffered binary stdout and is only flushed when
+    the reader is about to wait for input or the worker pool goes idle, so
+    bursts of pipelined requests are answered with few writes.
+
+    Requests carrying an "id" run on a worker pool so that a later
+    notifications/cancelled message can abort them; requests without one
+    run one at a time in arrival order, as before. Either kind is answered
+    with a timeout error once its deadline passes.
+
+    Tool calls go through an AdmissionController before they reach a
+    worker, so calls queued behind a limit never hold a thread; calls it
+    sheds get an error response. The "limits/status" method is answered
+    straight from the reading thread with the limiter state and counters.
+    """
+
+    def __init__(self, stdin=None, stdout=None, framing=None):
+        stdin = stdin if stdin is not None else sys.stdin.buffer
+        self._read = getattr(stdin, "read1", stdin.read)
+        self._out = stdout if stdout is not None else sys.stdout.buffer
+        self._rbuf = bytearray()
+        self._scanned = 0  # bytes of the current line already searched for b"\n"
+        self._skip_body = False  # drop the body of a frame without a Content-Length
+        self._eof = False
+        self.framing = framing or os.environ.get("MCP_FRAMING") or None
+        self._last_framing = NEWLINE  # framing of the message parsed last
+        self._write_lock = threading.Lock()
+        self._pending = {}  # request id -> RequestContext
+        self._blocked = False  # reader is waiting for input
+        self._outstanding = 0  # requests dispatched and not yet answered
+        self._idle = threading.Condition(self._write_lock)
+        self._deadlines = []  # heap of (deadline, sequence, RequestContext)
+        self._deadline_lock = threading.Lock()
+        self._deadline_sequence = itertools.count()
+        self._wakeup = threading.Event()
+        self.admission = AdmissionController()
+
+    def read_message(self):
+        """Return the next raw message payload, or None at end of input"""
+        while True:
+            payload = self._parse()
+            if payload is not None:
+                return payload
+            if self._eof:
+                return self._drain()
+            # About to block on input: push out everything written so far
+            with self._write_lock:
+                self._out.flush()
+                self._blocked = True
+            try:
+                chunk = self._read(_READ_SIZE)
+            finally:
+                self._blocked = False
+            if chunk:
+                self._rbuf += chunk
+            else:
+                self._eof = True
+
+    def write_message(self, obj, framing=None, flush=False):
+        try:
+            payload = dumps(obj)
+        except Exception as e:
+            payload = dumps({"error": str(e)})
+        with self._write_lock:
+            if (self.framing or framing) == CONTENT_LENGTH:
+                self._out.write(b"Content-Length: %d\r\n\r\n" % len(payload))
+                self._out.write(payload)
+            else:
+                self._out.write(payload + b"\n")
+            if flush or self._blocked:
+                self._out.flush()
+
+    def flush(self):
+        with self._write_lock:
+            self._out.flush()
+
+    def serve(self, handler, tool_timeouts=None, rate_limits=None, max_workers=16):
+        """Dispatch every incoming request to ``handler`` until stdin closes"""
+        tool_timeouts = load_tool_timeouts(tool_timeouts)
+        self.admission = AdmissionController(load_rate_limits(rate_limits), on_change=self._wakeup.set)
+        stopped = threading.Event()
+        scheduler = threading.Thread(target=self._schedule, args=(stopped,), daemon=True)
+        scheduler.start()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool, \
+                ThreadPoolExecutor(max_workers=1) as in_order:
+            while True:
+                request = None
+                try:
+                    message = self.read_message()
+                    if message is None:
+                        break
+                    request = loads(message)
+                    method = request.get("method")
+                    if method == "notifications/cancelled":
+                        self._cancel(request.get("params") or {})
+                        continue
+                    if method == "limits/status":
+                        self.write_message(_with_id({"limits": self.admission.snapshot()}, request),
+                                           self._last_framing)
+                        continue
+                    context = self._start(request, tool_timeouts)
+                except Exception as e:
+                    self.write_message(_with_id({"error": str(e)}, request), self._last_framing)
+                    continue
+
+                with self._write_lock:
+                    self._outstanding += 1
+                if context.request_id is None:
+                    in_order.submit(self._run_in_order, handler, request, context)
+                else:
+                    self._admit(request, context,
+                                lambda permit, r=request, c=context: pool.submit(self._run, handler, r, c, permit),
+                                lambda error, c=context: self._reject(c, error))
+
+            # Queued requests still need the pools once they are admitted
+            with self._idle:
+                self._idle.wait_for(lambda: self._outstanding == 0)
+        stopped.set()
+        self._wakeup.set()
+        self.flush()
+
+    def _schedule(self, stopped):
+        """Drive the admission queue and expire requests whose deadline has passed"""
+        while not stopped.is_set():
+            delay = self.admission.poll()
+            due = self._expire_due()
+            if due is not None and (delay is None or due < delay):
+                delay = due
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def _expire_due(self):
+        """Time out overdue requests; return the seconds until the next deadline"""
+        expired = []
+        with self._deadline_lock:
+            while self._deadlines:
+                deadline, _, context = self._deadlines[0]
+                left = deadline - context.clock()
+                if left > 0 and not context.finished:
+                    break
+                heapq.heappop(self._deadlines)
+                if not context.finished:
+                    expired.append(context)
+            left = self._deadlines[0][0] - self._deadlines[0][2].clock() if self._deadlines else None
+        for context in expired:
+            self._expire(context)
+        return left
+
+    def _start(self, request, tool_timeouts):
+        context = RequestContext(request.get("id"), request_timeout(request, tool_timeouts))
+        context.framing = self._last_framing
+        if context.request_id is not None:
+            self._pending[context.request_id] = context
+        if context.deadline is not None:
+            with self._deadline_lock:
+                entry = (context.deadline, next(self._deadline_sequence), context)
+                heapq.heappush(self._deadlines, entry)
+                earliest = self._deadlines[0] is entry
+                if len(self._deadlines) > 2 * self._outstanding + 1024:
+                    # Answered requests stay in the heap until their deadline; prune them
+                    self._deadlines = [e for e in self._deadlines if not e[2].finished]
+                    heapq.heapify(self._deadlines)
+            if earliest:
+                self._wakeup.set()  # The scheduler may be sleeping past this deadline
+        return context
+
+    def _admit(self, request, context, on_admit, on_reject):
+        """Pass tool calls through admission control; anything else goes straight on"""
+        try:
+            if request.get("method") != "tools/call":
+                on_admit(nullcontext())
+                return
+            params = request.get("params") or {}
+            priority = int((params.get("_meta") or {}).get("priority", 0))
+            self.admission.submit(params.get("name"), on_admit, on_reject, priority, context)
+        except Exception as e:
+            on_reject(e)
+
+    def _run_in_order(self, handler, request, context):
+        """Requests without an id wait for admission one at a time, keeping their order"""
+        outcome = []
+        settled = threading.Event()
+
+        def settle(value):
+            outcome.append(value)
+            settled.set()
+
+        self._admit(request, context, settle, settle)
+        settled.wait()
+        if isinstance(outcome[0], Exception):
+            self._reject(context, outcome[0])
+        else:
+            self._run(handler, request, context, outcome[0])
+
+    def _run(self, handler, request, context, permit):
+        try:
+            with permit:
+                if context.should_abort():
+                    return  # cancelled or expired while waiting for a worker
+                with request_context(context):
+                    try:
+                        response = handler(request)
+                    except Exception as e:
+                        response = {"error": str(e)}
+            if context.expired():
+                response = _timeout_error(context)  # Report the timeout, not the interrupted work
+            self._finish(context, response)
+        finally:
+            self._done()
+
+    def _reject(self, context, error):
+        try:
+            self._finish(context, {"error": str(error)})
+        finally:
+            self._done()
+
+    def _done(self):
+        with self._idle:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._out.flush()
+                self._idle.notify_all()
+
+    def _expire(self, context):
+        context.cancel("timeout")
+        self._finish(context, _timeout_error(context), flush=True)
+
+    def _cancel(self, params):
+        """Handle notifications/cancelled - the client expects no response"""
+        context = self._pending.get(params.get("requestId"))
+        if context is not None:
+            context.cancel(params.get("reason") or "cancelled")
+            if context.claim():
+                self._pending.pop(context.request_id, None)
+
+    def _finish(self, context, response, flush=False):
+        if not context.claim():
+            return  # already answered by a timeout or dropped by a cancellation
+        if context.request_id is not None:
+            self._pending.pop(context.request_id, None)
+            if isinstance(response, dict):
+                response = {**response, "id": context.request_id}
+        self.write_message(response, context.framing, flush)
+
+    def _parse(self):
+        buf = self._rbuf
+
+        # Skip blank lines between messages
+        start = 0
+        while start < len(buf) and buf[start] in b" \t\r\n":
+            start += 1
+        if start:
+            del buf[:start]
+            self._scanned = 0
+        if not buf:
+            return None
+
+        if self._skip_body and not _HEADER_RE.match(buf):
+            end = buf.find(b"\n")
+            if end < 0:
+                return None
+            del buf[:end + 1]
+            self._scanned = 0
+            self._skip_body = False
+            return self._parse()
+        self._skip_body = False
+
+        if _HEADER_RE.match(buf):
+            self._scanned = 0  # Only meaningful while the line looked like JSON
+            return self._parse_framed()
+
+        end = buf.find(b"\n", self._scanned)
+        if end < 0:
+            self._scanned = len(buf)
+            return None
+        payload = bytes(buf[:end])
+        del buf[:end + 1]
+        self._scanned = 0
+        self._last_framing = NEWLINE
+        return payload
+
+    def _parse_framed(self):
+        buf = self._rbuf
+        sep, sep_len = buf.find(b"\r\n\r\n"), 4
+        bare = buf.find(b"\n\n", 0, sep if sep >= 0 else len(buf))
+        if sep < 0 or 0 <= bare < sep:
+            sep, sep_len = bare, 2
+        if sep < 0:
+            return None
+
+        body_start = sep + sep_len
+        length = None
+        for header in bytes(buf[:sep]).decode("ascii", "replace").splitlines():
+            name, _, value = header.partition(":")
+            if name.strip().lower() == "content-length" and value.strip().isdigit():
+                length = int(value.strip())
+        if length is None:
+            # The body's extent is unknown: drop it up to the next line break
+            del buf[:body_start]
+            self._skip_body = True
+            self._last_framing = CONTENT_LENGTH
+            raise ValueError("Missing or invalid Content-Length header")
+        if len(buf) < body_start + length:
+            return None
+
+        payload = bytes(buf[body_start:body_start + length])
+        del buf[:body_start + length]
+        self._last_framing = CONTENT_LENGTH
+        return payload
+
+    def _drain(self):
+        """Treat trailing bytes without a newline as a final message"""
+        buf = self._rbuf
+        if self._skip_body or not buf.strip() or _HEADER_RE.match(buf):
+            buf.clear()
+            return None
+        payload = bytes(buf)
+        buf.clear()
+        self._last_framing = NEWLINE
+        return payload
+
+
+def _with_id(response, request):
+    """Echo the request's id, when it has one, so the client can match the error"""
+    if isinstance(request, dict) and request.get("id") is not None:
+        return {**response, "id": request["id"]}
+    return response
+
+
+def _timeout_error(context):
+    return {"error": f"Request timed out after {context.timeout:g}s"}
+
+
+def serve_stdio(handler, tool_timeouts=None, rate_limits=None):
+    """Run an MCP server's request handler over stdin/stdout"""
+    StdioTransport().serve(handler, tool_timeouts, rate_limits)
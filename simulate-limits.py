@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Admission Control Simulator
+Drives mcp_limits with a simulated clock and fake upstreams and checks the results
+"""
+
+import random
+import sys
+
+from mcp_deadlines import RequestContext
+from mcp_limits import AdmissionController, AdmissionRejected
+
+SIMULATED_SECONDS = 60
+TICK = 0.1
+
+CONFIG = {
+    "tools": {"execute_query": {"concurrency": 1, "queue": 5, "max_wait": 2}},
+    "upstreams": {
+        "bedrock": {"rate": 1, "burst": 2, "concurrency": 2, "queue": 4, "max_wait": 3},
+        "wttr.in": {"rate": 1, "burst": 3, "concurrency": 2, "queue": 2, "max_wait": 1}
+    },
+    "tool_upstreams": {"invoke_bedrock_model": "bedrock", "get_weather": "wttr.in"}
+}
+
+# Calls per second offered to each tool, and how long its fake upstream takes
+TRAFFIC = {
+    "invoke_bedrock_model": (4.0, 1.5),
+    "get_weather": (3.0, 0.3),
+    "execute_query": (5.0, 0.05)
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeUpstream:
+    """Records the calls it receives and finishes each after a fixed latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = []
+        self.running = []  # (finish time, permit)
+        self.peak_in_flight = 0
+
+    def call(self, now, permit):
+        self.calls.append(now)
+        self.running.append((now + self.latency, permit))
+        self.peak_in_flight = max(self.peak_in_flight, len(self.running))
+
+    def finish(self, now):
+        done = [entry for entry in self.running if entry[0] <= now]
+        self.running = [entry for entry in self.running if entry[0] > now]
+        for _, permit in done:
+            permit.release()
+
+    def calls_between(self, start, end):
+        return sum(1 for t in self.calls if start <= t < end)
+
+
+class Recorder:
+    """Collects the admit/reject callbacks of queued calls"""
+
+    def __init__(self):
+        self.events = []
+
+    def admit(self, name):
+        return lambda permit: self.events.append((name, "admitted", permit))
+
+    def reject(self, name):
+        return lambda error: self.events.append((name, "rejected", error))
+
+    def names(self, outcome):
+        return [name for name, event, _ in self.events if event == outcome]
+
+
+failures = []
+
+
+def check(label, condition):
+    print(f"  {'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        failures.append(label)
+
+
+def submit(controller, recorder, tool, name, **kwargs):
+    return controller.submit(tool, recorder.admit(name), recorder.reject(name), **kwargs)
+
+
+def check_priority_order():
+    print("Priority order")
+    clock = FakeClock()
+    controller = AdmissionController({"tools": {"t": {"concurrency": 1, "queue": 5}}}, clock=clock)
+    holder = controller.try_acquire("t")
+    recorder = Recorder()
+    for name, priority in [("low", 0), ("high", 5), ("mid", 1), ("low-2", 0)]:
+        submit(controller, recorder, "t", name, priority=priority)
+
+    check("queued calls wait while the slot is held", controller.poll() is None and not recorder.events)
+    holder.release()
+    for _ in range(4):
+        controller.poll()
+        admitted = [permit for _, event, permit in recorder.events if event == "admitted"]
+        admitted[-1].release()
+    check("admitted highest priority first, then in arrival order",
+          recorder.names("admitted") == ["high", "mid", "low", "low-2"])
+
+
+def check_queue_full():
+    print("Shedding when the queue is full")
+    controller = AdmissionController({"tools": {"t": {"concurrency": 1, "queue": 2}}}, clock=FakeClock())
+    controller.try_acquire("t")
+    recorder = Recorder()
+    submit(controller, recorder, "t", "a")
+    submit(controller, recorder, "t", "b")
+    try:
+        submit(controller, recorder, "t", "c")
+        shed = False
+    except AdmissionRejected:
+        shed = True
+    state = controller.snapshot()["tool:t"]
+    check("third queued call is shed", shed)
+    check("counters show 2 queued and 1 rejected", state["queued"] == 2 and state["rejected"] == 1)
+
+
+def check_queue_timeout():
+    print("Queued call timing out")
+    clock = FakeClock()
+    controller = AdmissionController({"tools": {"t": {"concurrency": 1, "queue": 5, "max_wait": 5}}}, clock=clock)
+    controller.try_acquire("t")
+    recorder = Recorder()
+    submit(controller, recorder, "t", "max-wait")
+    submit(controller, recorder, "t", "deadline", context=RequestContext(timeout=2, clock=clock))
+
+    check("poll reports the nearest wait running out", controller.poll() == 2)
+    clock.now = 2
+    controller.poll()
+    check("request deadline ends the wait", recorder.names("rejected") == ["deadline"])
+    clock.now = 5
+    controller.poll()
+    check("max_wait ends the wait", recorder.names("rejected") == ["deadline", "max-wait"])
+    check("timed_out counter", controller.snapshot()["tool:t"]["timed_out"] == 2)
+
+
+def check_cancel_while_queued():
+    print("Queued call being cancelled")
+    clock = FakeClock()
+    changes = []
+    controller = AdmissionController({"tools": {"t": {"concurrency": 1, "queue": 5}}}, clock=clock,
+                                     on_change=lambda: changes.append(clock.now))
+    holder = controller.try_acquire("t")
+    recorder = Recorder()
+    context = RequestContext(request_id=1, clock=clock)
+    submit(controller, recorder, "t", "cancelled", context=context)
+    submit(controller, recorder, "t", "kept")
+
+    before = len(changes)
+    context.cancel()
+    check("cancellation wakes the scheduler", len(changes) > before)
+    controller.poll()
+    check("cancelled call is dropped", recorder.names("rejected") == ["cancelled"])
+    holder.release()
+    controller.poll()
+    check("the next call takes its place", recorder.names("admitted") == ["kept"])
+    check("cancelled counter", controller.snapshot()["tool:t"]["cancelled"] == 1)
+
+
+def check_tool_and_upstream():
+    print("Tool and upstream limits together")
+    clock = FakeClock()
+    controller = AdmissionController({
+        "tools": {"a": {"concurrency": 1, "queue": 5}},
+        "upstreams": {"api": {"rate": 1, "burst": 1, "queue": 5}},
+        "tool_upstreams": {"a": "api", "b": "api"}
+    }, clock=clock)
+    recorder = Recorder()
+    submit(controller, recorder, "a", "a1")
+    submit(controller, recorder, "b", "b1")
+    submit(controller, recorder, "a", "a2")
+    check("first call takes the only token", recorder.names("admitted") == ["a1"])
+
+    check("others wait about one second for a token", abs(controller.poll() - 1.0) < 1e-9)
+    clock.now = 1
+    controller.poll()
+    check("the other tool on the upstream goes next", recorder.names("admitted") == ["a1", "b1"])
+    clock.now = 2
+    controller.poll()
+    check("tool concurrency holds back a2 despite a token",
+          recorder.names("admitted") == ["a1", "b1"])
+    recorder.events[0][2].release()
+    controller.poll()
+    check("a2 runs once a1 finishes", recorder.names("admitted") == ["a1", "b1", "a2"])
+
+
+def check_invalid_settings():
+    print("Rejecting settings that could never admit a call")
+    for label, settings in [("burst below 1", {"rate": 1, "burst": 0.5}),
+                            ("burst without a rate", {"burst": 3, "concurrency": 1}),
+                            ("rate of zero", {"rate": 0})]:
+        try:
+            AdmissionController({"tools": {"t": settings}})
+            raised = False
+        except ValueError:
+            raised = True
+        check(f"{label} raises ValueError", raised)
+
+
+def replay_traffic():
+    print(f"Replay: {SIMULATED_SECONDS}s of bursty traffic, tick {TICK}s")
+    clock = FakeClock()
+    controller = AdmissionController(CONFIG, clock=clock)
+    upstreams = {tool: FakeUpstream(latency) for tool, (_, latency) in TRAFFIC.items()}
+    rng = random.Random(42)
+    rejected = {tool: 0 for tool in TRAFFIC}
+
+    def on_reject(tool):
+        def reject(error):
+            rejected[tool] += 1
+        return reject
+
+    while clock.now < SIMULATED_SECONDS:
+        for tool, (rate, _) in TRAFFIC.items():
+            upstreams[tool].finish(clock.now)
+            for _ in range(sum(1 for _ in range(10) if rng.random() < rate * TICK / 10)):
+                try:
+                    controller.submit(tool, lambda permit, t=tool: upstreams[t].call(clock.now, permit),
+                                      on_reject(tool))
+                except AdmissionRejected:
+                    rejected[tool] += 1
+        controller.poll()
+        clock.now = round(clock.now + TICK, 6)
+
+    for tool, upstream in upstreams.items():
+        print(f"  {tool:<22} calls {len(upstream.calls):>4}  shed {rejected[tool]:>4}  "
+              f"peak in flight {upstream.peak_in_flight}")
+
+    bedrock = upstreams["invoke_bedrock_model"]
+    check("Bedrock never sees more than 2 calls in flight", bedrock.peak_in_flight <= 2)
+    check("Bedrock stays within rate 1/s plus burst 2",
+          all(bedrock.calls_between(t, t + 10) <= 10 + 2 for t in range(SIMULATED_SECONDS - 10)))
+    check("SQLite runs one query at a time", upstreams["execute_query"].peak_in_flight <= 1)
+    check("overloaded upstreams shed excess load",
+          rejected["invoke_bedrock_model"] > 0 and rejected["get_weather"] > 0)
+
+
+def main():
+    print("Admission Control Simulator")
+    print("===========================")
+    for scenario in (check_priority_order, check_queue_full, check_queue_timeout,
+                     check_cancel_while_queued, check_tool_and_upstream, check_invalid_settings,
+                     replay_traffic):
+        scenario()
+        print()
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        return 1
+    print("All checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())